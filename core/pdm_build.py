@@ -0,0 +1,31 @@
+"""
+Optional mypyc build of the pure-Python hot paths.
+
+    TEQUILA_MYPYC=1 pdm build --no-isolation
+
+needs mypy and setuptools in the build environment (`pdm install -G mypyc`).
+Without the variable the wheel stays pure Python, and the compiled modules
+fall back to their `.py` sources wherever the extension is missing.
+"""
+
+import os
+
+# Only modules without pydantic models or async generators, which mypyc rejects
+MYPYC_MODULES = ["src/tequila/markdown.py"]
+
+
+def _enabled() -> bool:
+    return os.getenv("TEQUILA_MYPYC", "") not in ("", "0")
+
+
+def pdm_build_initialize(context):
+    if _enabled() and context.target != "sdist":
+        context.config.build_config["run-setuptools"] = True
+
+
+def pdm_build_update_setup_kwargs(context, setup_kwargs):
+    if not _enabled():
+        return
+    from mypyc.build import mypycify
+
+    setup_kwargs["ext_modules"] = mypycify(MYPYC_MODULES)
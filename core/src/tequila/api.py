@@ -1,8 +1,10 @@
 from fastapi import FastAPI, HTTPException, Depends
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.routing import APIRoute
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
 from typing import Optional, List, Union, Literal
+import orjson
 
 from pydantic_ai.models.openai import OpenAIChatModel
 from tequila.storage.space import Space
@@ -41,13 +43,25 @@ def generate_unique_id(route: APIRoute):
     return str(route.name)
 
 
+# Dumps a whole list of articles in one pydantic-core call
+_articles_adapter = TypeAdapter(list[Article])
+
+
+def _json_response(model: BaseModel) -> ORJSONResponse:
+    """Serialize a model directly, skipping FastAPI's response-model re-validation."""
+    return ORJSONResponse(model.model_dump(mode="json"))
+
+
 app = FastAPI(
     title="Tequila Wiki API",
     version="1.0.0",
     lifespan=lifespan,
     root_path="/api",
     generate_unique_id_function=generate_unique_id,
+    default_response_class=ORJSONResponse,
 )
+# Starlette leaves text/event-stream uncompressed, so this only affects JSON
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=6)
 
 
 @app.get("/")
@@ -85,6 +99,7 @@ async def generate_article(
         context = request.context
 
     async def generate():
+        last_dump = None
         async for article in _gen_article(
             model=model,
             space=space,
@@ -94,19 +109,24 @@ async def generate_article(
             style_inst=request.style_inst,
             streaming=request.streaming,
         ):
-            yield f"data: {article.model_dump_json()}\n\n"
+            dump = orjson.dumps(article.model_dump(mode="json"))
+            # The pipeline re-yields the same article between steps
+            if dump == last_dump:
+                continue
+            last_dump = dump
+            yield b"data: " + dump + b"\n\n"
 
     # return EventSourceResponse(generate())
     return StreamingResponse(generate(), media_type="text/event-stream")
 
 
-@app.get("/spaces/{space_name}/articles/{title}")
-async def get_article(title: str, space: Space = Depends(get_space)) -> Article:
+@app.get("/spaces/{space_name}/articles/{title}", response_model=Article)
+async def get_article(title: str, space: Space = Depends(get_space)) -> ORJSONResponse:
     """Get a proto article with context for the given title."""
     # res = await _get_proto_with_context(space=space, title=title)
     doc = await read_doc(space, name=title)
     if isinstance(doc, Article):
-        return doc
+        return _json_response(doc)
     elif doc is None:
         raise HTTPException(status_code=404, detail=f"Article '{title}' not found")
     else:
@@ -115,40 +135,56 @@ async def get_article(title: str, space: Space = Depends(get_space)) -> Article:
         )
 
 
-@app.get("/spaces/{space_name}/articles/{title}/proto")
+@app.get(
+    "/spaces/{space_name}/articles/{title}/proto",
+    response_model=ProtoArticle | Article,
+)
 async def get_article_proto(
     title: str, space: Space = Depends(get_space)
-) -> ProtoArticle | Article:
+) -> ORJSONResponse:
     """Get a proto article with context for the given title."""
     # res = await _get_proto_with_context(space=space, title=title)
     doc = await read_doc(space, name=title)
     if doc is None:
         raise HTTPException(status_code=404, detail=f"Article '{title}' not found")
-    return doc
+    return _json_response(doc)
 
 
-@app.get("/spaces/{space_name}/articles/{title}/proto/context")
+@app.get(
+    "/spaces/{space_name}/articles/{title}/proto/context",
+    response_model=ProtoWithContextResponse,
+)
 async def get_article_proto_with_context(
     title: str, space: Space = Depends(get_space)
-) -> ProtoWithContextResponse:
+) -> ORJSONResponse:
     """Get a proto article with context for the given title."""
     res = await _get_proto_with_context(space=space, title=title)
     if res is None:
         raise HTTPException(status_code=404, detail=f"Article '{title}' not found")
     proto, context = res
-    return ProtoWithContextResponse(proto=proto, context=context)
+    return _json_response(ProtoWithContextResponse(proto=proto, context=context))
 
 
-@app.get("/spaces/{space_name}/articles/{title}/proto/related")
+@app.get(
+    "/spaces/{space_name}/articles/{title}/proto/related",
+    response_model=ProtoWithRelatedResponse,
+)
 async def get_article_proto_with_related(
     title: str, space: Space = Depends(get_space)
-) -> ProtoWithRelatedResponse:
+) -> ORJSONResponse:
     """Get a proto article with related articles for the given title."""
     res = await _get_proto_with_related_articles(space=space, title=title)
     if res is None:
         raise HTTPException(status_code=404, detail=f"Article '{title}' not found")
     proto, related_articles = res
-    return ProtoWithRelatedResponse(proto=proto, related_articles=related_articles)
+    return ORJSONResponse(
+        {
+            "proto": proto.model_dump(mode="json"),
+            "related_articles": _articles_adapter.dump_python(
+                related_articles, mode="json"
+            ),
+        }
+    )
 
 
 schema = app.openapi()
@@ -160,6 +196,7 @@ app.openapi = lambda: schema
 
 if __name__ == "__main__":
     import os
+    import sys
     import uvicorn
     from dotenv import load_dotenv
     import logfire
@@ -175,4 +212,12 @@ if __name__ == "__main__":
 
 
     load_dotenv()
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        # "auto" would silently fall back to asyncio / h11 if these are missing
+        loop="uvloop" if sys.platform != "win32" else "auto",
+        http="httptools",
+        workers=1,
+    )
@@ -2,10 +2,12 @@ from prompt_bottle import render
 from pydantic_ai.models import Model
 from pydantic_ai import Agent, TextOutput
 from pydantic import BaseModel, Field, TypeAdapter
+from tequila.markdown import scan_lines
 from tequila.utils import value_error_to_retry
 import re
 import yaml
-from typing import Literal, Annotated, TypeAlias
+from typing import Any, Literal, Annotated, Mapping, Self, TypeAlias
+from functools import cached_property
 
 PROMPT = """
 <Instruction>
@@ -59,6 +61,13 @@ class ProtoArticle(BaseModel):
     alt_title: set[str] = Field(default_factory=set)
 
 
+# Strict mode needs at least one <em></em> pair, opened and closed on one line
+_EM_RE = re.compile(r"<em>.*?</em>")
+
+# Fields that Article.content is rendered from
+_CONTENT_FIELDS = frozenset({"title", "summary", "sections"})
+
+
 class Article(ProtoArticle):
     kind: Literal["article"] = "article"
     summary: str = ""
@@ -101,20 +110,20 @@ class Article(ProtoArticle):
 
         # Extract title - first check frontmatter, then look for first # heading
         title = None
-        title_line_idx = None
 
         # Check frontmatter for title
         if "title" in frontmatter:
             title = str(frontmatter["title"]).strip()
 
-        # look for # heading
-        for i, line in enumerate(lines):
-            if line.strip().startswith("# "):
-                # YAML frontmatter title takes precedence over # heading title
-                if not title:
-                    title = line.replace("# ", "").strip()
-                title_line_idx = i
-                break
+        # Single pass over the lines, splitting them by heading
+        scanned = scan_lines(lines)
+        title_line_idx = scanned.title_line_idx
+        first_section_idx = scanned.first_section_idx
+        summary_lines = scanned.summary_lines
+
+        # YAML frontmatter title takes precedence over # heading title
+        if not title and title_line_idx is not None:
+            title = lines[title_line_idx].replace("# ", "").strip()
 
         if not title:
             if strict:
@@ -125,26 +134,16 @@ class Article(ProtoArticle):
                 return cls(title="")
 
         # Check for sections (should have ## headings)
-        section_lines = []
-        for i, line in enumerate(lines):
-            if line.strip().startswith("## "):
-                section_lines.append(i)
-
-        has_sections = len(section_lines) > 0
+        has_sections = first_section_idx is not None
         if not has_sections and strict:
             raise ValueError(
                 "Text must contain at least one section with '## ' heading"
             )
 
-        # Extract summary (content between title and first section)
-        summary_start = (title_line_idx + 1) if title_line_idx is not None else 0
-        summary_end = section_lines[0] if section_lines else len(lines)
-
-        summary_lines = []
-        for i in range(summary_start, summary_end):
-            if i < len(lines) and lines[i].strip():
-                summary_lines.append(lines[i])
-
+        # Summary is the content between title and first section,
+        # or everything before the first section without a # heading
+        if title_line_idx is None:
+            summary_lines = scanned.head_lines
         summary = "\n".join(summary_lines).strip()
 
         if not strict and not has_sections:
@@ -152,7 +151,7 @@ class Article(ProtoArticle):
 
         if not summary and strict:
             if title_line_idx is not None and (
-                not section_lines or section_lines[0] <= title_line_idx + 1
+                first_section_idx is None or first_section_idx <= title_line_idx + 1
             ):
                 raise ValueError(
                     "Text must have summary content between title and first section"
@@ -160,45 +159,29 @@ class Article(ProtoArticle):
             elif not summary_lines:
                 raise ValueError("Summary section cannot be empty")
 
-        # Extract all <em> tags and their content (for validation only)
+        # Check for <em> tags, no need to extract them
         if strict:
-            em_pattern = r"<em>(.*?)</em>"
-            em_matches = re.findall(em_pattern, content_text)
-
-            if not em_matches:
+            if _EM_RE.search(content_text) is None:
                 raise ValueError(
                     "Text must contain fictional terms wrapped in <em></em> tags as required by prompt"
                 )
 
         # Extract sections
         sections = []
+        for section_title, section_body in zip(
+            scanned.section_titles, scanned.section_bodies
+        ):
+            section_content = "\n".join(section_body).strip()
 
-        if section_lines:
-            for i, section_start in enumerate(section_lines):
-                # Determine section end
-                section_end = (
-                    section_lines[i + 1] if i + 1 < len(section_lines) else len(lines)
-                )
-
-                # Extract section title
-                section_title = lines[section_start].replace("## ", "").strip()
-
-                # Extract section content
-                section_content_lines = []
-                for j in range(section_start + 1, section_end):
-                    if j < len(lines) and lines[j].strip():
-                        section_content_lines.append(lines[j])
-
-                section_content = "\n".join(section_content_lines).strip()
-
-                if not section_content:
-                    if strict:
-                        raise ValueError(f"Section '{section_title}' cannot be empty")
-                    else:
-                        break
+            if not section_content:
+                if strict:
+                    raise ValueError(f"Section '{section_title}' cannot be empty")
+                else:
+                    break
 
-                # Add section even if content is empty in non-strict mode
-                sections.append(Section(title=section_title, content=section_content))
+            # Validated construction runs in pydantic-core; model_construct is
+            # a Python loop and measured about 2x slower here
+            sections.append(Section(title=section_title, content=section_content))
 
         if not sections and strict:
             raise ValueError("Text must contain at least one section")
@@ -210,22 +193,105 @@ class Article(ProtoArticle):
             sections=sections,
         )
 
-    @property
+    @cached_property
     def content(self) -> str:
+        """
+        Rendered markdown, cached until title, summary or sections is reassigned.
+
+        Editing a section in place does not invalidate it; assign a new list.
+        """
         return f"# {self.title}\n\n{self.summary}\n\n" + "\n\n".join(
             [f"## {section.title}\n\n{section.content}" for section in self.sections]
         )
 
+    def __setattr__(self, name: str, value: Any):
+        if name in _CONTENT_FIELDS:
+            self.__dict__.pop("content", None)
+        super().__setattr__(name, value)
+
+    def model_copy(
+        self, *, update: Mapping[str, Any] | None = None, deep: bool = False
+    ) -> Self:
+        copied = super().model_copy(update=update, deep=deep)
+        copied.__dict__.pop("content", None)
+        return copied
+
     def dump_md(self) -> str:
         return f"---\n{yaml.dump(self.model_dump(mode='json', exclude={'summary', 'sections'}), allow_unicode=True)}\n---\n\n{self.content}"
 
     def get_links(self) -> set[str]:
-        return {link for link in self.links}
+        return set(self.links)
 
 
 ProtoOrArticleType: TypeAlias = Annotated[ProtoArticle | Article, Field(discriminator="kind")]
 proto_or_article_adapter = TypeAdapter[ProtoOrArticleType](ProtoOrArticleType)
 
+# While streaming, only re-parse the partial text once it grew by this many chars
+_REPARSE_MIN_CHARS = 200
+
+
+class _StreamParser:
+    """
+    `Article.validate(text, strict=False)` for a text that keeps growing.
+
+    Everything before the last complete `## ` line is final once the text
+    has a `# ` title (and no frontmatter), so that prefix is parsed once per
+    new section and later calls only re-parse the trailing section.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._text = ""
+        self._scan_pos = 0
+        """Start of the first line not yet checked for a heading"""
+        self._headings: list[int] = []
+        """Offsets of complete `## ` lines"""
+        self._head: Article | None = None
+        self._head_end = -1
+
+    def parse(self, text: str) -> Article:
+        if not text.startswith(self._text):
+            self._reset()
+        self._text = text
+        self._scan(text)
+
+        if text.lstrip().startswith("---") or not self._headings:
+            return Article.validate(text, strict=False)
+        if self._headings[-1] != self._head_end:
+            self._head_end = self._headings[-1]
+            self._head = Article.validate(text[: self._head_end], strict=False)
+        head = self._head
+        assert head is not None
+        if not head.title:
+            # The title may still show up further down
+            return Article.validate(text, strict=False)
+        if len(head.sections) < len(self._headings) - 1:
+            # Stopped at an empty section, nothing after it is used
+            return head.model_copy()
+
+        sections = list(head.sections)
+        scanned = scan_lines(text[self._head_end :].split("\n"))
+        for section_title, section_body in zip(
+            scanned.section_titles, scanned.section_bodies
+        ):
+            section_content = "\n".join(section_body).strip()
+            if not section_content:
+                break
+            sections.append(Section(title=section_title, content=section_content))
+        return Article(title=head.title, summary=head.summary, sections=sections)
+
+    def _scan(self, text: str):
+        end = text.rfind("\n") + 1
+        pos = self._scan_pos
+        while pos < end:
+            nl = text.index("\n", pos)
+            if text[pos:nl].strip().startswith("## "):
+                self._headings.append(pos)
+            pos = nl + 1
+        self._scan_pos = pos
+
 
 async def write_article(
     model: Model,
@@ -258,16 +324,26 @@ async def write_article(
         res = (await agent.run(message_history=prompt)).output
     else:
         async with agent.run_stream(message_history=prompt) as stream:
+            parser = _StreamParser()
+            # Partials are thrown away, so they can all share one copy
+            alt_title = set(proto.alt_title)
+            parsed_len = None
             async for article_text in stream.stream_text(
                 debounce_by=0.1 if streaming==True else streaming # noqa: E712
             ):
-                tmp = Article.validate(article_text, strict=False)
+                if (
+                    parsed_len is not None
+                    and len(article_text) - parsed_len < _REPARSE_MIN_CHARS
+                ):
+                    continue
+                parsed_len = len(article_text)
+                tmp = parser.parse(article_text)
                 tmp.title = proto.title
-                tmp.alt_title = proto.alt_title
+                tmp.alt_title = alt_title
                 yield tmp
             res = await stream.get_output()
             res.title = proto.title
-            res.alt_title = proto.alt_title
+            res.alt_title = set(proto.alt_title)
 
     yield res
 
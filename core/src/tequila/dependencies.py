@@ -1,33 +1,61 @@
 from typing import AsyncGenerator
 from contextlib import asynccontextmanager
+import asyncio
+import logging
+from filelock import Timeout
 from fastapi import FastAPI
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic_ai.settings import ModelSettings
 from tequila.storage.space import Space
+from tequila.utils import LRUCache
 from opendal import AsyncOperator
+from opendal.exceptions import Error as OpendalError
+from opendal.layers import ConcurrentLimitLayer
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 # Global variables to store model
 _global_model: OpenAIChatModel = None # type: ignore
 
+# Max in-flight filesystem operations per space operator
+_FS_CONCURRENCY = 32
+
+# Spaces are reused across requests. An evicted Space still in use stays
+# safe, since its file lock still excludes the new instance
+_spaces: LRUCache[str, Space] = LRUCache(maxsize=32)
+
+
 # Dependency functions
 async def get_model() -> OpenAIChatModel:
     return _global_model
 
-async def get_space(space_name: str) -> Space:
+
+def _new_space(space_name: str) -> Space:
     opendal = AsyncOperator(
         "fs",
-        root=str(Path('data')/Path(space_name)),
-    )
-    space = Space(
+        root=str(Path("data") / Path(space_name)),
+    ).layer(ConcurrentLimitLayer(_FS_CONCURRENCY))
+    return Space(
         name=space_name,
         _opendal=opendal,
         _docs_path="docs",
-        _graph_file="graph.pkl",
-        _lock_fs_file=str(Path('data')/Path(space_name)/Path("graph.lock")),
+        _graph_file="graph.json",
+        _journal_file="graph.journal",
+        _generation_file="graph.version",
+        _legacy_graph_file="graph.pkl",
+        _lock_fs_file=str(Path("data") / Path(space_name) / Path("graph.lock")),
     )
+
+
+async def get_space(space_name: str) -> Space:
+    space = _spaces.get(space_name)
+    if space is None:
+        space = _new_space(space_name)
+        _spaces.put(space_name, space)
     return space
 
+
 def new_model():
     return OpenAIChatModel(
         model_name="google/gemini-3-flash-preview", provider="openrouter",
@@ -37,10 +65,32 @@ def new_model():
     )
     
 
+async def _warm_up_spaces():
+    """
+    Load the graphs of the spaces already on disk, as many as stay cached.
+
+    Runs in the background, and skips any space that is locked for too long
+    or can't be read, so that it never holds up or fails startup.
+    """
+    data = Path("data")
+    if not data.is_dir():
+        return
+    names = sorted(path.name for path in data.iterdir() if path.is_dir())
+    for name in names[: _spaces.maxsize]:
+        space = await get_space(name)
+        try:
+            async with space.shared():
+                pass
+        except (Timeout, OSError, OpendalError) as e:
+            logger.warning(f"Skipped warming up space {name}: {e!r}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Startup
     global _global_model
     _global_model = new_model()
+    warm_up = asyncio.create_task(_warm_up_spaces())
     yield
     # Shutdown (if needed)
+    warm_up.cancel()
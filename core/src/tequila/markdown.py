@@ -0,0 +1,52 @@
+"""
+Line scanner behind `Article.validate`.
+
+Kept free of pydantic and async code so that it can be compiled with mypyc,
+see `pdm_build.py`. The plain Python module is used when it is not compiled.
+"""
+
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ScannedLines:
+    title_line_idx: int | None = None
+    """Index of the first `# ` heading"""
+    first_section_idx: int | None = None
+    """Index of the first `## ` heading"""
+    head_lines: list[str] = field(default_factory=list)
+    """Non-empty lines before the first `# ` heading and any section"""
+    summary_lines: list[str] = field(default_factory=list)
+    """Non-empty lines after the first `# ` heading, before any section"""
+    section_titles: list[str] = field(default_factory=list)
+    section_bodies: list[list[str]] = field(default_factory=list)
+
+
+def scan_lines(lines: list[str]) -> ScannedLines:
+    """Split markdown lines by heading in a single pass."""
+    res = ScannedLines()
+    section_titles = res.section_titles
+    section_bodies = res.section_bodies
+    body: list[str] | None = None
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith("## "):
+            if res.first_section_idx is None:
+                res.first_section_idx = i
+            section_titles.append(line.replace("## ", "").strip())
+            body = []
+            section_bodies.append(body)
+        elif res.title_line_idx is None and stripped.startswith("# "):
+            res.title_line_idx = i
+            # A heading after a section still counts as its content
+            if body is not None:
+                body.append(line)
+        elif not stripped:
+            continue
+        elif body is not None:
+            body.append(line)
+        elif res.title_line_idx is None:
+            res.head_lines.append(line)
+        else:
+            res.summary_lines.append(line)
+    return res
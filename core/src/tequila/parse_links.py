@@ -4,10 +4,12 @@ from pydantic_ai import Agent, TextOutput
 from pydantic import BaseModel
 import re
 
-from tequila.article import Article
+from tequila.article import Article, Section
 from tequila.utils import value_error_to_retry
 from qwq_tag import QwqTag
 
+_EM_RE = re.compile(r"<em>(.*?)</em>")
+
 PROMPT = """
 <Instruction>
 分析文中所有 em 标记的条目，识别并合并同义变体。
@@ -69,6 +71,7 @@ class _Link(BaseModel):
             raise ValueError("Empty input text")
 
         links: list[_Link] = []
+        seen: set[str] = set()  # Names of all links, for duplicate checks
         onto_links: dict[str, _Link] = {}  # Map idx to onto Link objects
 
         for tag in tags:
@@ -83,12 +86,13 @@ class _Link(BaseModel):
                 if not word:
                     raise ValueError("Empty <onto> tag found")
 
-                if word in [x.name for x in links]:
+                if word in seen:
                     raise ValueError(f"Duplicate link: {word}")
 
                 # Create the main link
                 main_link = _Link(name=word, alter=[])
                 links.append(main_link)
+                seen.add(word)
 
                 # Only store in onto_links if it has an idx (for potential alt references)
                 if idx:
@@ -116,7 +120,7 @@ class _Link(BaseModel):
                 if alter_text == onto_link.name:
                     continue
 
-                if alter_text in [x.name for x in links]:
+                if alter_text in seen:
                     raise ValueError(f"Duplicate link: {alter_text}")
 
                 # Add to onto link's alter list
@@ -127,6 +131,7 @@ class _Link(BaseModel):
                 # Create alter link that points to the onto link
                 alter_link = _Link(name=alter_text, alter=None, alt_of=onto_link.name)
                 links.append(alter_link)
+                seen.add(alter_text)
 
             else:
                 raise ValueError(
@@ -139,6 +144,17 @@ class _Link(BaseModel):
         return links
 
 
+# Joins article parts for _strip_em, see parse_links
+_PART_SEP = "\n\x00\n"
+
+
+def _strip_em(text: str) -> str:
+    # Only pay for the regex when there is something to strip
+    if "<em>" not in text:
+        return text
+    return _EM_RE.sub(r"\1", text)
+
+
 async def _link_parse(model: Model, text: str, lang: str) -> list[_Link]:
     prompt = render(PROMPT, model=model, text_=text, lang=lang)
     agent = Agent(
@@ -184,15 +200,19 @@ async def parse_links(model: Model, article: Article, lang: str):
         if link.name != article.title and link.alt_of is None:
             article.links[link.name] = set(link.alter) if link.alter else set()
 
-    def process_text(text: str) -> str:
-        return re.sub(r"<em>(.*?)</em>", r"\1", text)
-
-    # Process the article's summary
-    article.summary = process_text(article.summary)
-
-    # Process each section's content
-    for section in article.sections:
-        section.content = process_text(section.content)
+    # Strip the summary and every section in one regex pass. The parts are
+    # joined on a line of their own, which no match can span
+    parts = [article.summary, *(section.content for section in article.sections)]
+    if any("\x00" in part for part in parts):
+        parts = [_strip_em(part) for part in parts]
+    else:
+        parts = _strip_em(_PART_SEP.join(parts)).split(_PART_SEP)
+    article.summary = parts[0]
+    # Reassign so the cached content is dropped
+    article.sections = [
+        Section(title=section.title, content=content)
+        for section, content in zip(article.sections, parts[1:])
+    ]
 
 
 async def main():
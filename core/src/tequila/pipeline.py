@@ -1,12 +1,20 @@
-from tequila.article import ProtoArticle, Article
-import networkx as nx
+from tequila.article import ProtoArticle, Article, ProtoOrArticleType
+import numpy as np
+from dataclasses import dataclass
+from itertools import islice
 
 from tequila.parse_links import parse_links
+from tequila.pagerank import (
+    TransitionMatrix,
+    iter_ranked,
+    personalized_pagerank,
+    transition_matrix,
+)
 from pydantic_ai.models import Model
 from tequila.storage.space import Space
-from tequila.storage.docs import upsert_doc, read_doc
+from tequila.storage.docs import node_kind, read_docs, upsert_doc
 from tequila.dependencies import get_space, new_model
-from tequila.utils import replace_text_with_links
+from tequila.utils import LRUCache, replace_text_with_links
 from tequila.article import (
     write_article,
 )
@@ -36,6 +44,82 @@ async def _gen_article(
     await upsert_doc(space, article)
 
 
+@dataclass(slots=True)
+class _Related:
+    proto: ProtoOrArticleType
+    related: list[Article]
+    context: list[str] | None = None
+    """Rendered related texts, filled lazily by _get_proto_with_context"""
+
+
+# Keyed by (space name, graph version)
+_matrix_cache: LRUCache[tuple[str, int], TransitionMatrix] = LRUCache(maxsize=8)
+
+# Keyed by (space name, title, graph version, alpha, top_k)
+_related_cache: LRUCache[tuple[str, str, int, float, int], _Related] = LRUCache(
+    maxsize=256
+)
+
+
+async def _get_related(
+    space: Space,
+    title: str,
+    *,
+    alpha: float,
+    top_k: int,
+) -> _Related | None:
+    async with space.shared() as res:
+        key = (space.name, title, res.version, alpha, top_k)
+        cached = _related_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Get the article content
+        (article,) = await read_docs(res, [title])
+        if article is None:
+            return None
+
+        tm = _matrix_cache.get((space.name, res.version))
+        if tm is None:
+            tm = transition_matrix(res.g)
+            _matrix_cache.put((space.name, res.version), tm)
+
+        personalization = np.zeros(len(tm.nodes))
+        personalization[tm.index[title]] = 1
+        scores = personalized_pagerank(tm, personalization, alpha=alpha)
+        ranked = iter_ranked(scores, window=top_k * 3)
+
+        connected_articles: list[Article] = []
+        # Read candidate articles a window at a time, in ranking order
+        while len(connected_articles) < top_k:
+            window = [tm.nodes[i] for i in islice(ranked, top_k * 3)]
+            if not window:
+                break
+            # Neither the article itself nor proto-articles can be related,
+            # so skip reading them
+            candidates = [
+                x for x in window if x != title and node_kind(res, x) != "proto_article"
+            ]
+            node_articles = await read_docs(res, candidates)
+            for node_title, node_article in zip(candidates, node_articles):
+                if node_article is None:
+                    logger.warning(
+                        f"Article {node_title} not found in space {space.name}"
+                    )
+                    continue
+                if node_article.title == title:
+                    continue
+                if node_article.kind == "article":
+                    connected_articles.append(node_article)
+                if len(connected_articles) >= top_k:
+                    break
+    logger.info(f"Connected articles: {[x.title for x in connected_articles]}")
+
+    entry = _Related(proto=article, related=connected_articles)
+    _related_cache.put(key, entry)
+    return entry
+
+
 async def _get_proto_with_related_articles(
     space: Space,
     title: str,
@@ -43,57 +127,27 @@ async def _get_proto_with_related_articles(
     alpha: float = 0.85,
     top_k: int = 10,
 ):
-    # Get the article content
-    article = await read_doc(space, title)
-    if article is None:
+    entry = await _get_related(space, title, alpha=alpha, top_k=top_k)
+    if entry is None:
         return None
-
-    # Get directly connected nodes (neighbors) of the title
-    async with space.mutex() as res:
-        undirected = nx.Graph(res.g)
-
-    ppr_dict = {node: 0 for node in undirected.nodes()}
-    ppr_dict[title] = 1
-    ppr_scores = nx.pagerank(undirected, alpha=alpha, personalization=ppr_dict)
-    sorted_ppr = sorted(ppr_scores.items(), key=lambda item: item[1], reverse=True)
-
-    connected_articles: list[Article] = []
-    # Read articles for each connected node
-    for node_title, _score in sorted_ppr:
-        node_article = await read_doc(space, node_title)
-        if node_article is None:
-            logger.warning(f"Article {node_title} not found in space {space.name}")
-            continue
-        if node_article.title == title:
-            continue
-        if node_article.kind == "article":
-            connected_articles.append(node_article)
-        if len(connected_articles) >= top_k:
-            break
-    logger.info(f"Connected articles: {[x.title for x in connected_articles]}")
-
-
-    return article, connected_articles
+    return entry.proto, entry.related
 
 
 async def _get_proto_with_context(
     space: Space,
     title: str,
 ):
-    res = await _get_proto_with_related_articles(
-        space,
-        title,
-    )
-    if res is None:
+    entry = await _get_related(space, title, alpha=0.85, top_k=10)
+    if entry is None:
         return None
-    proto, related = res
-    related_texts = [
-        "<RelatedArticle>"
-        + replace_text_with_links(x.content, set(x.links.keys()))
-        + "</RelatedArticle>\n"
-        for x in related
-    ]
-    return proto, related_texts
+    if entry.context is None:
+        entry.context = [
+            "<RelatedArticle>"
+            + replace_text_with_links(x.content, x.links.keys())
+            + "</RelatedArticle>\n"
+            for x in entry.related
+        ]
+    return entry.proto, entry.context
 
 
 async def prepare(space_name: str):
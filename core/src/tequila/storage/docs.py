@@ -3,7 +3,7 @@ Document storage module for the Tequila wiki system.
 
 This module provides functionality for reading, writing, and managing wiki articles
 and their relationships using both file storage (via OpenDAL) and graph storage
-(via NetworkX MultiGraph). It handles both full articles and proto-articles (placeholders).
+(via NetworkX MultiDiGraph). It handles both full articles and proto-articles (placeholders).
 
 The module supports:
 - Reading documents from storage with graph validation
@@ -12,24 +12,38 @@ The module supports:
 - Managing graph relationships between articles
 """
 
+import asyncio
+
+import orjson
+
 from opendal import AsyncOperator
 from opendal.exceptions import NotFound
 
-from networkx import MultiGraph
+from networkx import MultiDiGraph
 
-from pathlib import Path
 from tequila.article import (
     proto_or_article_adapter,
     ProtoOrArticleType,
     Article,
     ProtoArticle,
 )
-from tequila.storage.space import Space
+from tequila.storage.space import Space, SpaceRes, _executor
+
+
+def _doc_key(path: str, name: str) -> str:
+    """Storage key of a document, relative to the opendal."""
+    # Plain formatting, a pathlib join costs about 20x as much
+    return f"{path}/{name}.json"
+
+
+def _dump_doc(content: ProtoOrArticleType) -> bytes:
+    """A document as stored, JSON encoded."""
+    return orjson.dumps(content.model_dump(mode="json"))
 
 
 async def _read_doc(
     opendal: AsyncOperator,
-    g: "MultiGraph[str] ",
+    g: "MultiDiGraph[str] ",
     name: str,
     *,
     path: str,
@@ -42,7 +56,7 @@ async def _read_doc(
 
     Args:
         opendal: Async operator for file operations
-        g: NetworkX MultiGraph containing document relationships
+        g: NetworkX MultiDiGraph containing document relationships
         name: Name/title of the document to read
         path: Storage path for documents (default: "docs")
 
@@ -56,14 +70,87 @@ async def _read_doc(
     if g.has_node(name):
         # Read the JSON file from storage
         try:
-            text = await opendal.read(Path(path) / (name + ".json"))
+            text = await opendal.read(_doc_key(path, name))
         except NotFound:
             return None
-        return proto_or_article_adapter.validate_json(text)
+        # Decoding separately and validating the python object is
+        # noticeably faster than validate_json on CJK-heavy documents
+        return proto_or_article_adapter.validate_python(orjson.loads(text))
     else:
         return None
 
 
+async def _read_kind(
+    opendal: AsyncOperator,
+    g: "MultiDiGraph[str]",
+    name: str,
+    *,
+    path: str,
+) -> str | None:
+    """
+    Internal function to read only the kind of a document.
+
+    Same checks as _read_doc(), but the document is only decoded, not
+    validated into a model, for callers that need nothing else from it.
+    """
+    if g.has_node(name):
+        try:
+            text = await opendal.read(_doc_key(path, name))
+        except NotFound:
+            return None
+        return orjson.loads(text)["kind"]
+    else:
+        return None
+
+
+def _node_kind(g: "MultiDiGraph[str]", name: str) -> str | None:
+    """
+    Kind of the document as recorded on its graph node.
+
+    None if the node is missing, or was added by an older version that did
+    not record kinds.
+    """
+    if not g.has_node(name):
+        return None
+    return g.nodes[name].get("kind")
+
+
+def node_kind(res: SpaceRes, name: str) -> str | None:
+    """
+    Kind of a document by its graph node, without reading the document.
+
+    Args:
+        res: Resources of the opened space
+        name: Name/title of the document
+
+    Returns:
+        "article" or "proto_article", None if the node is missing or was
+        added by an older version that did not record kinds
+    """
+    return _node_kind(res.g, name)
+
+
+async def read_docs(
+    res: SpaceRes,
+    names: list[str],
+) -> list[ProtoOrArticleType | None]:
+    """
+    Read many documents of an opened space concurrently.
+
+    In-flight reads are capped by the operator's ConcurrentLimitLayer.
+
+    Args:
+        res: Resources of the opened space, e.g. from Space.shared()
+        names: Names/titles of the documents to read
+
+    Returns:
+        The documents in the order of names, None for those not found
+    """
+    return await asyncio.gather(
+        *(_read_doc(res.op, res.g, name, path=res.docs_path) for name in names)
+    )
+
+
 async def read_doc(
     graph: Space,
     name: str,
@@ -84,16 +171,14 @@ async def read_doc(
     Returns:
         ProtoOrArticleType: The document if found, None otherwise
     """
-    async with graph.mutex() as res:
+    async with graph.shared() as res:
         return await _read_doc(res.op, res.g, name, path=res.docs_path)
 
 
 async def _write_doc(
-    opendal: AsyncOperator,
-    g: "MultiGraph[str]",
+    res: SpaceRes,
     content: ProtoOrArticleType,
     *,
-    path: str,
     write_graph: bool = True,
 ):
     """
@@ -104,40 +189,42 @@ async def _write_doc(
     establishes graph relationships.
 
     Args:
-        opendal: Async operator for file operations
-        g: NetworkX MultiGraph for relationships (required if write_graph=True)
+        res: Resources of the opened space, graph changes are made through it
         content: Document content to write (Article or ProtoArticle)
-        path: Storage path for documents (default: "docs")
         write_graph: Whether to update the graph with this document
 
-    Raises:
-        ValueError: If write_graph=True but g is None
-
     Note:
         This is an internal function. Use write_doc() for external calls.
     """
+    # Any document change invalidates caches keyed on the space version
+    res.touch()
+
     if write_graph:
-        # Add the document as a node in the graph
-        g.add_node(content.title)
+        # Add the document as a node in the graph, with its kind so that
+        # upserts can pick a branch without reading the document
+        res.add_node(content.title, kind=content.kind)
 
         # If it's a full article, process its links
         if isinstance(content, Article):
-            for href, alters in content.links.items():
-                # Create or update proto-articles for linked documents
-                await _upsert_doc(
-                    opendal,
-                    g,
-                    ProtoArticle(title=href, alt_title=alters),
-                    path=path,
-                )
-                # Create an edge from this article to the linked article
-                g.add_edge(content.title, href, key=content.title)
-
-    # Write the document to file storage as JSON
-    await opendal.write(
-        Path(path) / (content.title + ".json"),
-        content.model_dump_json().encode("utf-8"),
+            # Create or update proto-articles for linked documents
+            await _upsert_protos(
+                res,
+                [
+                    ProtoArticle(title=href, alt_title=alters)
+                    for href, alters in content.links.items()
+                ],
+            )
+            # Create an edge from this article to each linked article
+            res.add_edges_from(
+                (content.title, href, content.title) for href in content.links
+            )
+
+    # Write the document to file storage as JSON, serialized in the pool
+    # the graph is dumped in, since a full article keeps the loop busy
+    data = await asyncio.get_running_loop().run_in_executor(
+        _executor, _dump_doc, content
     )
+    await res.op.write(_doc_key(res.docs_path, content.title), data)
 
 
 async def write_doc(
@@ -164,17 +251,12 @@ async def write_doc(
         proto-articles for any linked documents that don't exist yet.
     """
     async with graph.mutex() as res:
-        await _write_doc(
-            res.op, res.g, content, path=res.docs_path, write_graph=write_graph
-        )
+        await _write_doc(res, content, write_graph=write_graph)
 
 
 async def _upsert_doc(
-    opendal: AsyncOperator,
-    g: "MultiGraph[str]",
+    res: SpaceRes,
     content: ProtoOrArticleType,
-    *,
-    path: str,
 ):
     """
     Internal function to upsert (insert or update) a document.
@@ -187,30 +269,37 @@ async def _upsert_doc(
     - If existing article + new article: replace and clean up old links
 
     Args:
-        opendal: Async operator for file operations
-        g: NetworkX MultiGraph for managing relationships
+        res: Resources of the opened space, graph changes are made through it
         content: Document content to upsert
-        path: Storage path for documents (default: "docs")
 
     Note:
         This function handles complex cleanup when replacing articles,
         including removing orphaned proto-articles that are no longer linked.
     """
-    # Check if document already exists
-    readed = await _read_doc(opendal, g, content.title, path=path)
-
-    if readed is None:
+    # Check if document already exists, by the kind recorded in the graph
+    opendal, g, path = res.op, res.g, res.docs_path
+    kind = _node_kind(g, content.title)
+    if kind is None and g.has_node(content.title):
+        # Node of an older graph without a kind, read it from the document
+        kind = await _read_kind(opendal, g, content.title, path=path)
+
+    if kind is None:
         # Document doesn't exist, create it
-        await _write_doc(opendal, g, content, path=path)
-    elif readed.kind == "proto_article":
+        await _write_doc(res, content)
+    elif kind == "proto_article":
         # Existing document is a proto-article
         if content.kind == "proto_article":
             # Both are proto-articles: merge alternative titles
-            readed.alt_title.update(content.alt_title)
-            await _write_doc(opendal, g, readed, path=path, write_graph=False)
+            readed = await _read_doc(opendal, g, content.title, path=path)
+            if readed is None:
+                # Node without a file, write it anew
+                await _write_doc(res, content)
+            else:
+                readed.alt_title.update(content.alt_title)
+                await _write_doc(res, readed, write_graph=False)
         else:
             # New content is a full article: replace proto-article
-            await _write_doc(opendal, g, content, path=path)
+            await _write_doc(res, content)
     else:
         # Existing document is a full article
         if content.kind == "proto_article":
@@ -220,31 +309,88 @@ async def _upsert_doc(
             # Both are full articles: replace and clean up old links
 
             # Find all documents that this article links to
-            links = [
-                target
-                for source, target, key in g.edges(readed.title, keys=True)
-                if key == readed.title
+            links = [target for source, target in g.out_edges(content.title)]
+
+            # Kinds of the linked documents; only nodes of older graphs
+            # without a kind need their document read, and those concurrently
+            kinds = {link: _node_kind(g, link) for link in links}
+            unknown = [link for link, kind in kinds.items() if kind is None]
+            for link, link_kind in zip(
+                unknown,
+                await asyncio.gather(
+                    *(_read_kind(opendal, g, link, path=path) for link in unknown)
+                ),
+            ):
+                kinds[link] = link_kind
+
+            # Remove the edges from old article to its links, in memory
+            for link, kind in kinds.items():
+                if kind is not None:
+                    res.remove_edge(content.title, link, key=content.title)
+
+            # Proto-articles with no remaining links are orphaned
+            orphans = [
+                link
+                for link, kind in kinds.items()
+                if kind == "proto_article" and g.in_degree(link) == 0
             ]
+            # Delete them from graph and storage
+            for link in orphans:
+                res.remove_node(link)
+            await asyncio.gather(
+                *(opendal.delete(_doc_key(path, link)) for link in orphans)
+            )
 
-            # Clean up old links
-            for link in links:
-                link_doc = await _read_doc(opendal, g, link, path=path)
-                if link_doc is None:
-                    continue
+            # Write the new article (which will create new links)
+            await _write_doc(res, content)
 
-                # Remove the edge from old article to this link
-                g.remove_edge(readed.title, link, key=readed.title)
 
-                # If the linked document is a proto-article with no remaining links
-                if link_doc.kind == "proto_article":
-                    # Check if the link node has no incoming edges
-                    if len(list(g.edges(link))) == 0:
-                        # Delete the orphaned proto-article from graph and storage
-                        g.remove_node(link)
-                        await opendal.delete(Path(path) / (link + ".json"))
+async def _upsert_protos(
+    res: SpaceRes,
+    protos: list[ProtoArticle],
+):
+    """
+    Internal function to upsert many proto-articles at once.
 
-            # Write the new article (which will create new links)
-            await _write_doc(opendal, g, content, path=path)
+    Same outcome as calling _upsert_doc() for each of them, but the reads
+    of existing documents and then all writes are issued concurrently.
+    Titles that are not in the graph have no document to read.
+
+    Args:
+        res: Resources of the opened space, graph changes are made through it
+        protos: Proto-articles to upsert, with distinct titles
+    """
+    opendal, g, path = res.op, res.g, res.docs_path
+    # Existing full articles are kept as is, so they are not read either
+    existing = [
+        proto
+        for proto in protos
+        if g.has_node(proto.title) and _node_kind(g, proto.title) != "article"
+    ]
+    readed = dict(
+        zip(
+            (proto.title for proto in existing),
+            await asyncio.gather(
+                *(_read_doc(opendal, g, proto.title, path=path) for proto in existing)
+            ),
+        )
+    )
+
+    writes = []
+    for proto in protos:
+        if g.has_node(proto.title) and proto.title not in readed:
+            # An existing full article, by its graph node
+            continue
+        doc = readed.get(proto.title)
+        if doc is None:
+            # Document doesn't exist, create it
+            writes.append(_write_doc(res, proto))
+        elif doc.kind == "proto_article":
+            # Both are proto-articles: merge alternative titles
+            doc.alt_title.update(proto.alt_title)
+            writes.append(_write_doc(res, doc, write_graph=False))
+        # An existing full article is kept as is
+    await asyncio.gather(*writes)
 
 
 async def upsert_doc(
@@ -269,4 +415,4 @@ async def upsert_doc(
         edge cases and maintains consistency between articles and their links.
     """
     async with graph.mutex() as res:
-        await _upsert_doc(res.op, res.g, content, path=res.docs_path)
+        await _upsert_doc(res, content)
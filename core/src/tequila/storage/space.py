@@ -1,20 +1,298 @@
-from networkx import MultiGraph
+from networkx import MultiDiGraph, MultiGraph
 from opendal import AsyncOperator
+from opendal.exceptions import NotFound
 
 
+import asyncio
+import fcntl
+import os
 import pickle
+import struct
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from io import BytesIO
-from typing import AsyncGenerator
-from filelock import AsyncUnixFileLock, BaseAsyncFileLock
+from typing import Any, AsyncGenerator, Iterable
+from filelock import Timeout
 from dataclasses import dataclass, field
 
+import orjson
+
 
 @dataclass(slots=True)
 class SpaceRes:
     op: AsyncOperator
-    g: "MultiGraph[str]"
+    g: "MultiDiGraph[str]"
+    """Read-only; change it through the methods below so the change is journaled"""
     docs_path: str
+    ops: list[list[Any]] = field(default_factory=list)
+    """Graph changes made in this mutex, in order"""
+    dirty: bool = False
+    """Whether anything changed, bumping the version on mutex exit"""
+
+    @property
+    def version(self) -> int:
+        """Counter bumped on every committed change, usable as a cache key."""
+        return self.g.graph.get("version", 0)
+
+    def touch(self):
+        """Mark a document change that does not touch the graph."""
+        self.dirty = True
+
+    # Titles are interned on the way in, so that every node, endpoint and key
+    # with the same title is one str object with its hash computed once
+
+    def add_node(self, node: str, **attrs: Any):
+        node = sys.intern(node)
+        self.g.add_node(node, **attrs)
+        self._record(["add_node", node, attrs])
+
+    def add_edges_from(self, edges: Iterable[tuple[str, str, str]]):
+        """Add (u, v, key) edges."""
+        for u, v, key in edges:
+            u, v, key = sys.intern(u), sys.intern(v), sys.intern(key)
+            self.g.add_edge(u, v, key=key)
+            self._record(["add_edge", u, v, key])
+
+    def remove_edge(self, u: str, v: str, key: str):
+        self.g.remove_edge(u, v, key=key)
+        self._record(["remove_edge", u, v, key])
+
+    def remove_node(self, node: str):
+        self.g.remove_node(node)
+        self._record(["remove_node", node])
+
+    def _record(self, op: list[Any]):
+        self.ops.append(op)
+        self.dirty = True
+
+
+# u32 little-endian length prefix of each journal record
+_FRAME_HEADER = struct.Struct("<I")
+
+# Loading and dumping a whole graph is CPU-bound and would stall the event
+# loop; a small shared pool keeps the number of threads bounded
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="space")
+
+
+def _dump_graph(g: "MultiDiGraph[str]") -> bytes:
+    """Snapshot as parallel arrays, with edges as indices into nodes and keys."""
+    nodes = list(g)
+    index = {node: i for i, node in enumerate(nodes)}
+    keys: dict[str, int] = {}
+    edges = [
+        (index[u], index[v], keys.setdefault(key, len(keys)))
+        for u, v, key in g.edges(keys=True)
+    ]
+    return orjson.dumps(
+        {
+            "graph": g.graph,
+            "nodes": nodes,
+            "node_data": [g.nodes[node] for node in nodes],
+            "keys": list(keys),
+            "edges": edges,
+        }
+    )
+
+
+def _orient(u: str, v: str, key: str) -> tuple[str, str, str]:
+    """
+    Direct an edge of a legacy, undirected pickled graph.
+
+    Every edge is keyed by the article it links from, so the key tells its
+    source whichever way round the undirected graph reports it.
+    """
+    return (v, u, key) if key == v != u else (u, v, key)
+
+
+def _directed(g: "MultiGraph[str]") -> "MultiDiGraph[str]":
+    """Directed copy of a legacy undirected graph."""
+    d: "MultiDiGraph[str]" = MultiDiGraph()
+    d.graph.update(g.graph)
+    d.add_nodes_from(g.nodes(data=True))
+    d.add_edges_from((*_orient(u, v, key), {}) for u, v, key in g.edges(keys=True))
+    return d
+
+
+def _load_graph(data: bytes) -> "MultiDiGraph[str]":
+    raw = orjson.loads(data)
+    g: "MultiDiGraph[str]" = MultiDiGraph()
+    g.graph.update(raw["graph"])
+    nodes = list(map(sys.intern, raw["nodes"]))
+    keys = list(map(sys.intern, raw["keys"]))
+    g.add_nodes_from(zip(nodes, raw["node_data"]))
+    g.add_edges_from((nodes[u], nodes[v], keys[k], {}) for u, v, k in raw["edges"])
+    return g
+
+
+def _split_frames(data: bytes) -> tuple[list[bytes], bool]:
+    """Journal records, and whether the journal ends on a record boundary."""
+    frames = []
+    pos = 0
+    while pos + _FRAME_HEADER.size <= len(data):
+        (size,) = _FRAME_HEADER.unpack_from(data, pos)
+        if pos + _FRAME_HEADER.size + size > len(data):
+            break
+        pos += _FRAME_HEADER.size
+        frames.append(data[pos : pos + size])
+        pos += size
+    return frames, pos == len(data)
+
+
+def _restore(snapshot: bytes, journal: bytes) -> tuple["MultiDiGraph[str]", bool]:
+    """Snapshot with the journal replayed, and whether the journal is complete."""
+    graph = _load_graph(snapshot)
+    frames, complete = _split_frames(journal)
+    for frame in frames:
+        _replay(graph, orjson.loads(frame))
+    return graph, complete
+
+
+def _replay(g: "MultiDiGraph[str]", ops: list[list[Any]]):
+    """
+    Apply journaled ops to g.
+
+    A snapshot is only written once the journal holds every op it contains,
+    so a journal left behind by a crash before its deletion is the full history
+    on top of the previous snapshot. Replaying that whole sequence again ends
+    in the state it started from: later ops win just as they did the first
+    time, and the version is never taken back.
+    """
+    for op, *args in ops:
+        if op == "add_node":
+            node, attrs = args
+            g.add_node(sys.intern(node), **attrs)
+        elif op == "add_edge":
+            u, v, key = map(sys.intern, args)
+            g.add_edge(u, v, key=key)
+        elif op == "remove_edge":
+            u, v, key = args
+            if g.has_edge(u, v, key=key):
+                g.remove_edge(u, v, key=key)
+        elif op == "remove_node":
+            (node,) = args
+            if g.has_node(node):
+                g.remove_node(node)
+        elif op == "graph":
+            (attrs,) = args
+            if attrs.get("version", 0) < g.graph.get("version", 0):
+                attrs = {**attrs, "version": g.graph["version"]}
+            g.graph.update(attrs)
+        else:
+            raise ValueError(f"Unknown graph journal op {op!r}")
+
+
+# Polling interval and timeout of the lock files, as with filelock's
+_LOCK_POLL_INTERVAL = 0.05
+_LOCK_TIMEOUT = 60
+
+
+async def _flock(path: str, operation: int) -> int:
+    """
+    Open path and flock it, polling so that the event loop keeps running.
+
+    Each call opens its own fd, so holds conflict even within a process.
+    Closing the returned fd unlocks it. Raises filelock.Timeout.
+    """
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    deadline = time.monotonic() + _LOCK_TIMEOUT
+    try:
+        while True:
+            try:
+                fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise Timeout(path) from None
+                await asyncio.sleep(_LOCK_POLL_INTERVAL)
+    except BaseException:
+        os.close(fd)
+        raise
+
+
+class _RWLock:
+    """
+    Lock that many tasks can hold for reading, or one for writing, across
+    processes.
+
+    Readers flock the lock file shared and writers exclusively, so readers
+    of every process run concurrently. Readers in this process share one
+    hold of it, taken by the first reader and released by the last, both
+    under the condition.
+
+    A writer also holds the gate file exclusively, from before it waits for
+    the lock until it is done, and every new reader passes through the gate
+    first. So while a writer of any process waits, new readers everywhere
+    hold back until the current ones are done, and a steady stream of reads
+    does not starve it. Within this process, waiting writers hold back new
+    readers before they even reach the gate.
+    """
+
+    def __init__(self, path: str, gate_path: str):
+        self._path = path
+        self._gate_path = gate_path
+        self._fd: int | None = None
+        """Shared hold of the readers of this process"""
+        self._cond = asyncio.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @asynccontextmanager
+    async def read(self) -> AsyncGenerator[None, None]:
+        # Outside the condition, so that readers can leave meanwhile
+        os.close(await _flock(self._gate_path, fcntl.LOCK_EX))
+        async with self._cond:
+            await self._cond.wait_for(
+                lambda: not self._writing and not self._writers_waiting
+            )
+            if not self._readers:
+                self._fd = await _flock(self._path, fcntl.LOCK_SH)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    assert self._fd is not None
+                    os.close(self._fd)
+                    self._fd = None
+                self._cond.notify_all()
+
+    @asynccontextmanager
+    async def write(self) -> AsyncGenerator[None, None]:
+        async with self._cond:
+            self._writers_waiting += 1
+            try:
+                await self._cond.wait_for(
+                    lambda: not self._writing and not self._readers
+                )
+            finally:
+                self._writers_waiting -= 1
+                # Readers held back by a cancelled writer may go on
+                self._cond.notify_all()
+            self._writing = True
+        try:
+            gate = await _flock(self._gate_path, fcntl.LOCK_EX)
+            try:
+                fd = await _flock(self._path, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    os.close(fd)
+            finally:
+                os.close(gate)
+        finally:
+            async with self._cond:
+                self._writing = False
+                self._cond.notify_all()
 
 
 @dataclass(slots=True, kw_only=True)
@@ -24,32 +302,152 @@ class Space:
     _docs_path: str
     """Reletive to the opendal"""
     _graph_file: str
-    """Reletive to the opendal"""
+    """Snapshot, reletive to the opendal"""
+    _journal_file: str
+    """Changes since the snapshot, reletive to the opendal"""
+    _generation_file: str
+    """Token rewritten on every change, reletive to the opendal"""
+    _legacy_graph_file: str | None = None
+    """Pickled graph of older versions, migrated on first read"""
     _lock_fs_file: str
-    """Should be a fs path"""
-    _lock: BaseAsyncFileLock = field(init=False)
+    """Should be a fs path, with a ".gate" file next to it"""
+    _rw_lock: _RWLock = field(init=False)
+    _snapshot_size: int = field(init=False, default=0)
+    _journal_size: int = field(init=False, default=0)
+    _cached_graph: "MultiDiGraph[str] | None" = field(init=False, default=None)
+    """Graph as of _cached_generation, reused while no process changed it"""
+    _cached_generation: bytes | None = field(init=False, default=None)
 
     def __post_init__(self):
-        self._lock = AsyncUnixFileLock(self._lock_fs_file, timeout=60)
+        self._rw_lock = _RWLock(self._lock_fs_file, f"{self._lock_fs_file}.gate")
+
+    async def _generation(self) -> bytes | None:
+        try:
+            return await self._opendal.read(self._generation_file)
+        except NotFound:
+            return None
+
+    async def _bump_generation(self) -> bytes:
+        """
+        Mark the files as changed, for every process caching the graph.
+
+        File metadata can't tell: an mtime may not tick between two commits,
+        and a rewritten snapshot may keep its length. So each change writes a
+        fresh token first; a crash before the files change only costs other
+        processes a reload.
+        """
+        generation = uuid.uuid4().hex.encode()
+        await self._opendal.write(self._generation_file, generation)
+        return generation
+
+    async def _read(self, *, repair: bool = True) -> "MultiDiGraph[str]":
+        """
+        The graph, from the cache unless another process changed the files.
+
+        The cached graph is shared by every caller, so it may only be changed
+        under the write lock. With repair, a torn journal or a legacy pickle
+        is rewritten as a snapshot, which needs the space for writing.
+        """
+        generation = await self._generation()
+        if self._cached_graph is not None and generation == self._cached_generation:
+            return self._cached_graph
+        graph, clean = await self._load(repair=repair)
+        # Until repaired, a writer has to load it again
+        self._cached_graph = graph if clean else None
+        # Read again, a repair bumps it
+        self._cached_generation = await self._generation()
+        return graph
 
-    async def _read(self) -> "MultiGraph[str]":
+    async def _load(self, *, repair: bool) -> tuple["MultiDiGraph[str]", bool]:
+        """The graph from storage, and whether it needs no repair."""
+        clean = True
         if await self._opendal.exists(self._graph_file):
-            f = await self._opendal.read(self._graph_file)
-            graph = pickle.load(BytesIO(f))
+            snapshot = await self._opendal.read(self._graph_file)
+            journal = b""
+            if await self._opendal.exists(self._journal_file):
+                journal = await self._opendal.read(self._journal_file)
+            graph, complete = await asyncio.get_running_loop().run_in_executor(
+                _executor, _restore, snapshot, journal
+            )
+            self._snapshot_size = len(snapshot)
+            self._journal_size = len(journal)
+            if not complete:
+                # Torn write at the tail, that record was never committed.
+                # Appending after it would misalign every later record
+                if repair:
+                    await self._bump_generation()
+                    await self._compact(graph)
+                else:
+                    clean = False
+        elif self._legacy_graph_file is not None and await self._opendal.exists(
+            self._legacy_graph_file
+        ):
+            f = await self._opendal.read(self._legacy_graph_file)
+            graph = _directed(pickle.load(BytesIO(f)))
+            if repair:
+                await self._bump_generation()
+                await self._compact(graph)
+            else:
+                clean = False
         else:
-            graph = MultiGraph()
-        return graph
+            graph = MultiDiGraph()
+        return graph, clean
 
-    async def _write(self, graph: "MultiGraph[str]"):
-        await self._opendal.write(self._graph_file, pickle.dumps(graph))
+    async def _compact(self, graph: "MultiDiGraph[str]"):
+        # Nothing else touches the graph while it is dumped, under the lock
+        snapshot = await asyncio.get_running_loop().run_in_executor(
+            _executor, _dump_graph, graph
+        )
+        await self._opendal.write(self._graph_file, snapshot)
+        await self._opendal.delete(self._journal_file)
+        self._snapshot_size = len(snapshot)
+        self._journal_size = 0
+
+    async def _write(self, graph: "MultiDiGraph[str]", ops: list[list[Any]]):
+        if not self._snapshot_size:
+            await self._compact(graph)
+            return
+        # Journal the commit even when compacting right after, so the snapshot
+        # holds exactly the old snapshot plus the whole journal
+        payload = orjson.dumps(ops)
+        await self._opendal.write(
+            self._journal_file,
+            _FRAME_HEADER.pack(len(payload)) + payload,
+            append=True,
+        )
+        self._journal_size += _FRAME_HEADER.size + len(payload)
+        if self._journal_size > self._snapshot_size // 2:
+            await self._compact(graph)
 
     @asynccontextmanager
     async def mutex(self) -> AsyncGenerator[SpaceRes, None]:
-        async with self._lock:
+        """Exclusive access to the space, committing graph changes on exit."""
+        async with self._rw_lock.write():
             graph = await self._read()
+            res = SpaceRes(op=self._opendal, g=graph, docs_path=self._docs_path)
             try:
-                yield SpaceRes(op=self._opendal, g=graph, docs_path=self._docs_path)
+                yield res
+                # Nothing to persist for read-only use
+                if res.dirty:
+                    version = res.version + 1
+                    graph.graph["version"] = version
+                    res.ops.append(["graph", {"version": version}])
+                    generation = await self._bump_generation()
+                    await self._write(graph, res.ops)
+                    self._cached_generation = generation
             except:
+                # The cached graph may hold changes that were never persisted
+                self._cached_graph = None
                 raise
-            else:
-                await self._write(graph)
+
+    @asynccontextmanager
+    async def shared(self) -> AsyncGenerator[SpaceRes, None]:
+        """
+        Read-only access to the space, shared with other readers.
+
+        Readers in this process run concurrently, while writers here and any
+        access from other processes wait. Changes are not persisted.
+        """
+        async with self._rw_lock.read():
+            graph = await self._read(repair=False)
+            yield SpaceRes(op=self._opendal, g=graph, docs_path=self._docs_path)
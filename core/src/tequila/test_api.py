@@ -1,10 +1,11 @@
 import asyncio
 import httpx
-import json
+import orjson
 from rich.live import Live
 from rich.text import Text
 from rich.panel import Panel
 from dotenv import load_dotenv
+from pydantic import TypeAdapter
 
 # Import the Article class and response models
 from tequila.article import Article
@@ -16,6 +17,34 @@ load_dotenv()
 BASE_URL = "http://localhost:8000"
 SPACE_NAME = "default"  # Default space name
 
+_article_adapter = TypeAdapter(Article)
+
+
+def _render_content(article_data: dict) -> str:
+    """Same markdown as Article.content, straight from a decoded frame."""
+    return f"# {article_data['title']}\n\n{article_data['summary']}\n\n" + "\n\n".join(
+        [
+            f"## {section['title']}\n\n{section['content']}"
+            for section in article_data["sections"]
+        ]
+    )
+
+
+async def _iter_sse_data(response: httpx.Response):
+    """Yield the raw `data: ` payloads of an SSE response, split from its bytes."""
+    buf = bytearray()
+    async for chunk in response.aiter_bytes():
+        buf += chunk
+        start = 0
+        while (end := buf.find(b"\n", start)) >= 0:
+            line = buf[start:end]
+            start = end + 1
+            if line.startswith(b"data: "):
+                yield bytes(line[6:])  # Remove 'data: ' prefix
+        # Keep the incomplete line for the next chunk
+        del buf[:start]
+
+
 async def test_gen_article_without_proto():
     """Test generating an article from scratch without existing proto."""
     
@@ -49,27 +78,29 @@ async def test_gen_article_without_proto():
                     return
                 
                 current_article = None
-                async for line in response.aiter_lines():
-                    if line.startswith('data: '):
-                        try:
-                            # Parse the JSON data
-                            json_data = line[6:]  # Remove 'data: ' prefix
-                            article_data = json.loads(json_data)
-                            
-                            # Parse as Article object
-                            current_article = Article.model_validate(article_data)
+                last_data = None
+                async for json_data in _iter_sse_data(response):
+                    try:
+                        # Parse the JSON data
+                        article_data = orjson.loads(json_data)
                             
-                            # Update the display with the current content
-                            content_panel = Panel(
-                                current_article.content,
-                                title=f"Generated Article: {new_article_title}",
-                                title_align="left",
-                                border_style="green",
-                            )
-                            live.update(content_panel)
-                        except (json.JSONDecodeError, Exception) as e:
-                            # Skip invalid JSON lines or parsing errors
-                            continue
+                        # Update the display with the current content, rendered
+                        # from the frame itself; only the final one is validated
+                        content_panel = Panel(
+                            _render_content(article_data),
+                            title=f"Generated Article: {new_article_title}",
+                            title_align="left",
+                            border_style="green",
+                        )
+                        live.update(content_panel)
+                        last_data = article_data
+                    except (orjson.JSONDecodeError, Exception) as e:
+                        # Skip invalid JSON lines or parsing errors
+                        continue
+
+                # Parse as Article object
+                if last_data is not None:
+                    current_article = _article_adapter.validate_python(last_data)
             
             print(f"\nArticle generation completed for '{new_article_title}'!")
             if current_article:
@@ -124,27 +155,29 @@ async def test_gen_article_pipeline():
                     return
                 
                 current_article = None
-                async for line in response.aiter_lines():
-                    if line.startswith('data: '):
-                        try:
-                            # Parse the JSON data
-                            json_data = line[6:]  # Remove 'data: ' prefix
-                            article_data = json.loads(json_data)
+                last_data = None
+                async for json_data in _iter_sse_data(response):
+                    try:
+                        # Parse the JSON data
+                        article_data = orjson.loads(json_data)
                             
-                            # Parse as Article object
-                            current_article = Article.model_validate(article_data)
-                            
-                            # Update the display with the current content
-                            content_panel = Panel(
-                                current_article.content,
-                                title="Generated Article",
-                                title_align="left",
-                                border_style="blue",
-                            )
-                            live.update(content_panel)
-                        except (json.JSONDecodeError, Exception) as e:
-                            # Skip invalid JSON lines or parsing errors
-                            continue
+                        # Update the display with the current content, rendered
+                        # from the frame itself; only the final one is validated
+                        content_panel = Panel(
+                            _render_content(article_data),
+                            title="Generated Article",
+                            title_align="left",
+                            border_style="blue",
+                        )
+                        live.update(content_panel)
+                        last_data = article_data
+                    except (orjson.JSONDecodeError, Exception) as e:
+                        # Skip invalid JSON lines or parsing errors
+                        continue
+
+                # Parse as Article object
+                if last_data is not None:
+                    current_article = _article_adapter.validate_python(last_data)
             
             print(f"\nArticle generation completed!")
             if current_article:
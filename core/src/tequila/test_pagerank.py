@@ -1,4 +1,7 @@
 import networkx as nx
+import numpy as np
+
+from tequila.pagerank import iter_ranked, personalized_pagerank, transition_matrix
 
 # 1. Create a sample graph
 G = nx.fast_gnp_random_graph(n=100, p=0.05, seed=42)
@@ -6,25 +9,28 @@ G = nx.fast_gnp_random_graph(n=100, p=0.05, seed=42)
 # 2. Define your center node
 center_node = 42
 
-# Create the personalization dictionary
-# It gives all the starting "weight" to your center node.
-personalization_dict = {node: 0 for node in G.nodes()}
-personalization_dict[center_node] = 1
-
 # 3. Run Personalized PageRank
-# The `personalization` parameter biases the random walks to start from your center node.
-ppr_scores = nx.pagerank(G, alpha=0.85, personalization=personalization_dict)
+# Power iteration on the sparse transition matrix, built once per graph.
+tm = transition_matrix(G)
+
+# The personalization vector gives all the starting "weight" to your center node,
+# which biases the random walks to start from it.
+personalization = np.zeros(len(tm.nodes))
+personalization[tm.index[center_node]] = 1
+scores = personalized_pagerank(tm, personalization, alpha=0.85)
 
-# 4. Sort the nodes by their score
+# 4. Rank the nodes by their score
+# Only the top 11 are partitioned out and sorted, enough for 10 besides the center node.
 # We exclude the center node itself from the results, as it will have the highest score.
-sorted_ppr = sorted(ppr_scores.items(), key=lambda item: item[1], reverse=True)
+ranked = iter_ranked(scores, window=11)
 
 # 5. Select and print the top 10 related nodes
 print(f"Top 10 nodes most related to node {center_node}:")
 top_10_related = []
-for node, score in sorted_ppr:
+for i in ranked:
+    node = tm.nodes[i]
     if node != center_node: # Exclude the center node itself
-        top_10_related.append((node, score))
+        top_10_related.append((node, float(scores[i])))
     if len(top_10_related) == 10:
         break
 
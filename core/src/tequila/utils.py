@@ -1,10 +1,24 @@
 from pydantic_ai import ModelRetry
-from typing import Callable, ParamSpec, TypeVar, TypedDict
+from typing import (
+    Callable,
+    Collection,
+    Generic,
+    Hashable,
+    ParamSpec,
+    TypeVar,
+    TypedDict,
+)
+from collections import OrderedDict
+from functools import lru_cache
 import re
 
+import ahocorasick
+
 
 R = TypeVar("R")
 P = ParamSpec("P")
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
 
 
 def value_error_to_retry(func: Callable[[str], R]) -> Callable[[str], R]:
@@ -17,6 +31,27 @@ def value_error_to_retry(func: Callable[[str], R]) -> Callable[[str], R]:
     return wrapper
 
 
+class LRUCache(Generic[K, V]):
+    """A small in-memory mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._data: OrderedDict[K, V] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return None
+        return self._data[key]
+
+    def put(self, key: K, value: V):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
 class _MatchDict(TypedDict):
     start: int
     end: int
@@ -25,69 +60,147 @@ class _MatchDict(TypedDict):
     length: int
 
 
-def replace_text_with_links(text: str, terms: set[str]) -> str:
+def _lowers_exactly(s: str, folded: str) -> bool:
+    """
+    Whether comparing lowercased characters matches re.IGNORECASE on s.
+
+    Lowering must keep the length so offsets map back, and no character may
+    share its uppercase with another one that lowers differently, like "ı"
+    and "i", which re.IGNORECASE also treats as equal. A final sigma is ruled
+    out too, as str.lower only produces it at the end of a word.
+    """
+    return len(folded) == len(s) and "ς" not in folded and s.upper().lower() == folded
+
+
+@lru_cache(maxsize=64)
+def _get_automaton(terms: frozenset[str]) -> "ahocorasick.Automaton | None":
+    """
+    Aho-Corasick automaton over the lowercased terms, cached per term set.
+
+    Returns None if there are no terms, or if a term doesn't lower exactly;
+    see _lowers_exactly and _get_patterns.
+    """
+    automaton = ahocorasick.Automaton()
+    for term in terms:
+        folded = term.lower()
+        if not _lowers_exactly(term, folded):
+            return None
+        if term:
+            automaton.add_word(folded, (len(term), term))
+    if not len(automaton):
+        return None
+    automaton.make_automaton()
+    return automaton
+
+
+@lru_cache(maxsize=64)
+def _get_patterns(
+    terms: frozenset[str],
+) -> tuple[tuple[re.Pattern[str], tuple[str, ...]], ...]:
+    """
+    Case-insensitive lookaheads over the terms, one per term length, cached
+    per term set, each with the terms its groups capture.
+
+    A lookahead reports a single term per start position, and terms of the
+    same length matching there are interchangeable, so one per length is
+    enough to find every term at every position.
+    """
+    by_length: dict[int, list[str]] = {}
+    for term in sorted(filter(None, terms)):
+        by_length.setdefault(len(term), []).append(term)
+    return tuple(
+        (
+            re.compile(
+                "(?=(?:" + "|".join(f"({re.escape(t)})" for t in group) + "))",
+                re.IGNORECASE,
+            ),
+            tuple(group),
+        )
+        for _, group in sorted(by_length.items())
+    )
+
+
+def replace_text_with_links(text: str, terms: Collection[str]) -> str:
     """Replace terms in text with emphasis tags.
 
     Args:
         text: The input text to process
-        terms: Set of terms to wrap in emphasis tags
+        terms: Terms to wrap in emphasis tags, e.g. the keys of Article.links
 
     Returns:
         Text with matched terms wrapped in <em>term</em> tags
 
     If overlapping matches are found, prefers the longer match.
+    Empty terms are ignored.
     """
 
     # Find all potential matches with their positions
     matches: list[_MatchDict] = []
-    for term in terms:
-        # Find all occurrences of this term in the text
-        for match in re.finditer(re.escape(term), text, re.IGNORECASE):
-            start, end = match.span()
+    terms = frozenset(terms)
+    folded = text.lower()
+    automaton = _get_automaton(terms) if _lowers_exactly(text, folded) else None
+    # Like a per-term re.finditer, occurrences of the same term don't overlap
+    term_end: dict[str, int] = {}
+    if automaton is not None:
+        # One pass over the text; offsets line up because lowering kept the length
+        for end, (length, term) in automaton.iter(folded):
+            if end + 1 - length < term_end.get(term, 0):
+                continue
+            term_end[term] = end + 1
             matches.append(
                 _MatchDict(
-                    start=start, end=end, term=term, href="", length=end - start
+                    start=end + 1 - length,
+                    end=end + 1,
+                    term=term,
+                    href="",
+                    length=length,
                 )
             )
+    else:
+        # One regex pass per term length
+        for pattern, group in _get_patterns(terms):
+            for match in pattern.finditer(text):
+                assert match.lastindex is not None
+                term = group[match.lastindex - 1]
+                start, end = match.span(match.lastindex)
+                if start < term_end.get(term, 0):
+                    continue
+                term_end[term] = end
+                matches.append(
+                    _MatchDict(
+                        start=start,
+                        end=end,
+                        term=term,
+                        href="",
+                        length=end - start,
+                    )
+                )
 
     # Sort matches by start position, then by length (descending) for overlapping cases
     matches.sort(key=lambda x: (x["start"], -x["length"]))
 
-    # Remove overlapping matches, keeping the longer ones
+    # Remove overlapping matches, keeping the longer ones, in one sweep.
+    # Kept matches don't overlap and start no later than the current one,
+    # so only the last kept match can overlap it
     filtered_matches: list[_MatchDict] = []
     for match in matches:
-        # Check if this match overlaps with any already accepted match
-        overlaps = False
-        for accepted in filtered_matches:
-            if not (
-                match["end"] <= accepted["start"] or match["start"] >= accepted["end"]
-            ):
-                # There's an overlap
-                if match["length"] > accepted["length"]:
-                    # Remove the shorter accepted match
-                    filtered_matches.remove(accepted)
-                else:
-                    # Skip this match as it's shorter
-                    overlaps = True
-                    break
-
-        if not overlaps:
-            filtered_matches.append(match)
-
-    # Sort by start position for processing
-    filtered_matches.sort(key=lambda x: x["start"])
-
-    # Apply replacements from right to left to maintain correct positions
-    filtered_matches.reverse()
-
+        if filtered_matches and filtered_matches[-1]["end"] > match["start"]:
+            if match["length"] <= filtered_matches[-1]["length"]:
+                # Skip this match as it's not longer
+                continue
+            filtered_matches.pop()
+        filtered_matches.append(match)
+
+    # Build the output from slices in one go instead of re-splicing the text;
+    # matches were accepted in start order, so they are already sorted
+    parts: list[str] = []
+    last = 0
     for match in filtered_matches:
         start = match["start"]
         end = match["end"]
+        parts.append(text[last:start])
+        parts.append(f"<em>{text[start:end]}</em>")
+        last = end
+    parts.append(text[last:])
 
-        # Create the replacement emphasis tag
-        replacement = f'<em>{text[start:end]}</em>'
-
-        # Replace the text
-        text = text[:start] + replacement + text[end:]
-
-    return text
+    return "".join(parts)
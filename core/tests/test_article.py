@@ -0,0 +1,52 @@
+import unittest
+
+from tequila.article import Article, _StreamParser
+
+TEXTS = [
+    # Plain article, with indented and fake headings
+    (
+        "# 黑林村\n\n<em>黑林村</em>是一个村庄。\n\n## 历史\n\n第一段。\n第二段 ## 不是标题\n\n"
+        "  ## 地理\n\n### 河流\n\n<em>黑河</em>流经村庄。\n\n## 人口\n\n约三百人。\n"
+    ),
+    # Frontmatter, with its own title
+    "---\ntitle: Frontmatter\nalt_title: [a, b]\n---\n\nSummary.\n\n## One\n\nBody.\n",
+    # An empty section stops the article
+    "# Title\n\nSummary.\n\n## A\n\na\n\n## Empty\n\n## B\n\nb\n",
+    # Sections before the title, and a title further down
+    "## Early\n\nearly\n\n# Late title\n\nSummary.\n\n## After\n\nafter\n",
+    # No title at all
+    "Just a summary.\n\n## A\n\na\n",
+    # Windows line endings
+    "# CRLF\r\n\r\nSummary.\r\n\r\n## A\r\n\r\na\r\n\r\n## B\r\n\r\nb\r\n",
+]
+
+
+class StreamParserTest(unittest.TestCase):
+    def assertParsesLikeValidate(self, parser: _StreamParser, text: str):
+        self.assertEqual(
+            parser.parse(text).model_dump(),
+            Article.validate(text, strict=False).model_dump(),
+            repr(text),
+        )
+
+    def test_every_prefix(self):
+        for text in TEXTS:
+            parser = _StreamParser()
+            for end in range(len(text) + 1):
+                self.assertParsesLikeValidate(parser, text[:end])
+
+    def test_growing_in_chunks(self):
+        for text in TEXTS:
+            for step in [3, 17, 64]:
+                parser = _StreamParser()
+                for end in [*range(0, len(text), step), len(text)]:
+                    self.assertParsesLikeValidate(parser, text[:end])
+
+    def test_text_that_does_not_grow(self):
+        parser = _StreamParser()
+        for text in [TEXTS[0], TEXTS[2], TEXTS[2][:40], TEXTS[0]]:
+            self.assertParsesLikeValidate(parser, text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import asyncio
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+import unittest
+
+from networkx import MultiDiGraph, MultiGraph
+from opendal import AsyncOperator
+
+from tequila.storage.space import _FRAME_HEADER, Space, _replay
+
+
+def _space(root: str) -> Space:
+    return Space(
+        name="test",
+        _opendal=AsyncOperator("fs", root=root),
+        _docs_path="docs",
+        _graph_file="graph.json",
+        _journal_file="graph.journal",
+        _generation_file="graph.version",
+        _legacy_graph_file="graph.pkl",
+        _lock_fs_file=os.path.join(root, "graph.lock"),
+    )
+
+
+def _read_in_loops(root: str, loops: int, seconds: float, started):
+    """Keep the space busy with overlapping reads, as a busy worker would."""
+
+    async def loop(space: Space, until: float):
+        while time.monotonic() < until:
+            async with space.shared():
+                await asyncio.sleep(0.01)
+
+    async def main():
+        space = _space(root)
+        async with space.shared():
+            started.set()
+        until = time.monotonic() + seconds
+        await asyncio.gather(*(loop(space, until) for _ in range(loops)))
+
+    asyncio.run(main())
+
+
+class SpaceTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.root = self._dir.name
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def read(self, name: str) -> bytes:
+        with open(self.path(name), "rb") as f:
+            return f.read()
+
+    def write(self, name: str, data: bytes, *, append: bool = False):
+        with open(self.path(name), "ab" if append else "wb") as f:
+            f.write(data)
+
+    async def commit_links(self, space: Space):
+        """Two commits, the second of them left in the journal."""
+        async with space.mutex() as res:
+            # Padding, so that the journal stays short of compacting
+            for i in range(50):
+                res.add_node(f"n{i}")
+            for node in ["a", "b", "c"]:
+                res.add_node(node, kind="article")
+            res.add_edges_from([("a", "b", "a"), ("a", "c", "a")])
+        async with space.mutex() as res:
+            res.remove_edge("a", "c", "a")
+            res.add_edges_from([("b", "c", "b")])
+
+    async def edges(self, space: Space) -> list[tuple[str, str, str]]:
+        async with space.shared() as res:
+            return sorted(res.g.edges(keys=True))
+
+    async def test_torn_journal(self):
+        await self.commit_links(_space(self.root))
+        # A record cut off in the middle of its payload
+        self.write(
+            "graph.journal",
+            _FRAME_HEADER.pack(100) + b'[["remove_node", "a"',
+            append=True,
+        )
+
+        space = _space(self.root)
+        self.assertEqual(await self.edges(space), [("a", "b", "a"), ("b", "c", "b")])
+        self.assertTrue(os.path.exists(self.path("graph.journal")))
+
+        async with space.mutex() as res:
+            self.assertEqual(res.version, 2)
+        # Repaired into a snapshot, so later records line up again
+        self.assertFalse(os.path.exists(self.path("graph.journal")))
+        async with space.mutex() as res:
+            res.add_edges_from([("c", "a", "c")])
+        self.assertEqual(
+            await self.edges(_space(self.root)),
+            [("a", "b", "a"), ("b", "c", "b"), ("c", "a", "c")],
+        )
+
+    async def test_leftover_journal(self):
+        space = _space(self.root)
+        await self.commit_links(space)
+        # Undo part of the last commit, so replaying must end with later ops
+        async with space.mutex() as res:
+            res.remove_edge("b", "c", "b")
+            res.add_edges_from([("a", "c", "a")])
+        journal = self.read("graph.journal")
+        self.assertTrue(journal)
+        # Compact, as if deleting the journal afterwards had failed
+        async with space.mutex() as res:
+            await space._compact(res.g)
+        self.write("graph.journal", journal)
+
+        space = _space(self.root)
+        async with space.shared() as res:
+            self.assertEqual(res.version, 3)
+            self.assertEqual(
+                sorted(res.g.edges(keys=True)), [("a", "b", "a"), ("a", "c", "a")]
+            )
+            self.assertEqual(res.g.nodes["a"], {"kind": "article"})
+
+    def test_replay_keeps_version(self):
+        g = MultiDiGraph()
+        g.graph["version"] = 3
+        _replay(g, [["graph", {"version": 2}], ["add_node", "a", {}]])
+        self.assertEqual(g.graph["version"], 3)
+        _replay(g, [["graph", {"version": 4}]])
+        self.assertEqual(g.graph["version"], 4)
+
+    async def test_legacy_pickle(self):
+        g = MultiGraph()
+        g.graph["version"] = 7
+        g.add_node("a", kind="article")
+        # Undirected edges are keyed by their source, reported either way round
+        g.add_edge("b", "a", key="a")
+        g.add_edge("a", "c", key="a")
+        g.add_edge("c", "b", key="b")
+        # Reported from "a" first, as (a, c, c)
+        g.add_edge("c", "a", key="c")
+        self.write("graph.pkl", pickle.dumps(g))
+
+        space = _space(self.root)
+        expected = [("a", "b", "a"), ("a", "c", "a"), ("b", "c", "b"), ("c", "a", "c")]
+        self.assertEqual(await self.edges(space), expected)
+        self.assertFalse(os.path.exists(self.path("graph.json")))
+
+        async with space.mutex() as res:
+            self.assertEqual(res.version, 7)
+        self.assertTrue(os.path.exists(self.path("graph.json")))
+        async with _space(self.root).shared() as res:
+            self.assertEqual(sorted(res.g.edges(keys=True)), expected)
+            self.assertEqual(res.g.nodes["a"], {"kind": "article"})
+
+    async def test_readers_of_other_process_let_writes_through(self):
+        async with _space(self.root).mutex() as res:
+            res.add_node("a")
+        ctx = multiprocessing.get_context("spawn")
+        started = ctx.Event()
+        reader = ctx.Process(target=_read_in_loops, args=(self.root, 16, 5.0, started))
+        reader.start()
+        try:
+            self.assertTrue(await asyncio.to_thread(started.wait, 30))
+            await asyncio.sleep(0.5)
+            space = _space(self.root)
+            start = time.monotonic()
+            for node in ["d", "e", "f"]:
+                async with space.mutex() as res:
+                    res.add_node(node)
+            elapsed = time.monotonic() - start
+            # The reads were still going on the whole time
+            self.assertTrue(reader.is_alive())
+            self.assertLess(elapsed, 3)
+        finally:
+            await asyncio.to_thread(reader.join)
+        self.assertEqual(reader.exitcode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
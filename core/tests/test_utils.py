@@ -0,0 +1,83 @@
+import random
+import re
+import unittest
+
+from tequila.utils import replace_text_with_links
+
+
+def _reference(text: str, terms: set[str]) -> str:
+    """The original implementation: one re.finditer per term."""
+    matches = []
+    for term in filter(None, terms):
+        for match in re.finditer(re.escape(term), text, re.IGNORECASE):
+            matches.append((match.start(), match.end()))
+    matches.sort(key=lambda x: (x[0], x[0] - x[1]))
+
+    accepted: list[tuple[int, int]] = []
+    for start, end in matches:
+        overlaps = False
+        for other in list(accepted):
+            if not (end <= other[0] or start >= other[1]):
+                if end - start > other[1] - other[0]:
+                    accepted.remove(other)
+                else:
+                    overlaps = True
+                    break
+        if not overlaps:
+            accepted.append((start, end))
+
+    for start, end in sorted(accepted, reverse=True):
+        text = text[:start] + f"<em>{text[start:end]}</em>" + text[end:]
+    return text
+
+
+# Characters whose case mapping str.lower and re.IGNORECASE disagree on
+_TRICKY = "abAB ıIiİςσΣßẞ"
+
+
+class ReplaceTextWithLinksTest(unittest.TestCase):
+    def assertMatchesReference(self, text: str, terms: set[str]):
+        self.assertEqual(
+            replace_text_with_links(text, terms),
+            _reference(text, terms),
+            f"{text!r} {terms!r}",
+        )
+
+    def test_examples(self):
+        self.assertEqual(
+            replace_text_with_links("The Black Woods and black", {"black woods"}),
+            "The <em>Black Woods</em> and black",
+        )
+        self.assertEqual(
+            replace_text_with_links("黑林村的瘟疫", {"黑林村", "黑林", "瘟疫"}),
+            "<em>黑林村</em>的<em>瘟疫</em>",
+        )
+        self.assertEqual(replace_text_with_links("text", {""}), "text")
+
+    def test_unicode_fallback(self):
+        cases = [
+            ("Iı İi", {"ı"}),
+            ("Iı İi", {"i", "I"}),
+            ("İstanbul istanbul", {"i̇stanbul", "istanbul"}),
+            ("STRASSE Straße", {"straße", "ss"}),
+            ("ΟΔΟΣ οδός Σσς", {"οδος", "σ", "ς"}),
+            ("σaIΣ", {"ß", "σß", "ß Aß", "ßΣI", "ı"}),
+            # The longest term at a position loses to an overlapping one
+            ("abcd", {"abc", "a", "bcd"}),
+        ]
+        for text, terms in cases:
+            self.assertMatchesReference(text, terms)
+
+    def test_random(self):
+        rng = random.Random(0)
+        for _ in range(5000):
+            text = "".join(rng.choices(_TRICKY, k=rng.randint(0, 12)))
+            terms = {
+                "".join(rng.choices(_TRICKY, k=rng.randint(1, 4)))
+                for _ in range(rng.randint(0, 5))
+            }
+            self.assertMatchesReference(text, terms)
+
+
+if __name__ == "__main__":
+    unittest.main()